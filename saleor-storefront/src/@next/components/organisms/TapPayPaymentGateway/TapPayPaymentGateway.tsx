@@ -1,11 +1,107 @@
 import React, { useEffect, useRef, useState } from "react";
+import { defineMessages, IntlShape } from "react-intl";
 
 import { IFormError } from "@types";
 import { CompleteCheckout_checkoutComplete_order } from "@saleor/sdk/lib/mutations/gqlTypes/CompleteCheckout";
+import { LocalStorageItems } from "@saleor/sdk/lib/helpers/LocalStorageHandler/types";
 import { ErrorMessage } from "@components/atoms";
 
 export const tappayConfirmationStatus = ["AUTHORIZED", "CHARGED"];
 
+const tapPayMessages = defineMessages({
+  paymentCancelled: {
+    defaultMessage: "Payment was cancelled. Please try again.",
+    description: "tap payment cancelled error",
+  },
+  paymentDeclined: {
+    defaultMessage: "Payment was declined. Please use another payment method.",
+    description: "tap payment declined error",
+  },
+  paymentTimedOut: {
+    defaultMessage: "Payment timed out. Please try again.",
+    description: "tap payment timed out error",
+  },
+  paymentFailed: {
+    defaultMessage: "Payment failed. Please try again.",
+    description: "tap payment failed error",
+  },
+});
+
+export const translateTapPayConfirmationError = (
+  status: string,
+  intl: IntlShape
+): string => {
+  switch (status) {
+    case "CANCELLED":
+    case "ABANDONED":
+    case "VOID":
+      return intl.formatMessage(tapPayMessages.paymentCancelled);
+    case "DECLINED":
+    case "RESTRICTED":
+      return intl.formatMessage(tapPayMessages.paymentDeclined);
+    case "TIMEDOUT":
+      return intl.formatMessage(tapPayMessages.paymentTimedOut);
+    default:
+      return intl.formatMessage(tapPayMessages.paymentFailed);
+  }
+};
+
+const TAPPAY_PAYMENT_STATUS_PATH = "/plugins/tappayment.gosell/payment-status";
+
+export interface TapPayPaymentStatus {
+  status: string;
+  is_success: boolean;
+  order: {
+    id: string;
+    number: string;
+    token: string;
+  } | null;
+}
+
+/**
+ * Drops the checkout and payment stored by the SDK, which the SDK only does after its own
+ * checkoutComplete mutation. Needed when the Tap webhook has already completed the checkout.
+ * The SDK reads the storage on load, so the page has to be reloaded afterwards.
+ */
+export const clearTapPayCheckoutStorage = () => {
+  localStorage.removeItem(LocalStorageItems.CHECKOUT);
+  localStorage.removeItem(LocalStorageItems.PAYMENT);
+};
+
+/**
+ * Waits for the payment status published by the Tap webhook.
+ * Resolves with null when the stream isn't available or times out, so the caller can
+ * fall back to completing the checkout.
+ */
+export const subscribeTapPayPaymentStatus = (
+  payment: string,
+  checkout: string
+): Promise<TapPayPaymentStatus | null> =>
+  new Promise(resolve => {
+    if (typeof EventSource === "undefined" || !process.env.API_URI) {
+      resolve(null);
+      return;
+    }
+    const url = new URL(TAPPAY_PAYMENT_STATUS_PATH, process.env.API_URI);
+    url.searchParams.set("payment", payment);
+    url.searchParams.set("checkout", checkout);
+
+    const source = new EventSource(url.toString());
+    const finish = (status: TapPayPaymentStatus | null) => {
+      source.close();
+      resolve(status);
+    };
+    source.addEventListener("status", event => {
+      try {
+        finish(JSON.parse((event as MessageEvent).data));
+      } catch (parseError) {
+        finish(null);
+      }
+    });
+    source.addEventListener("timeout", () => finish(null));
+    source.onerror = () => finish(null);
+  });
+
 interface TapPayError {
   error?: string;
 }
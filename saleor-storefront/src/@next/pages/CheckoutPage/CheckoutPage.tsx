@@ -10,6 +10,9 @@ import {
   translateAdyenConfirmationError,
   adyenNotNegativeConfirmationStatusCodes,
   tappayConfirmationStatus,
+  subscribeTapPayPaymentStatus,
+  clearTapPayCheckoutStorage,
+  translateTapPayConfirmationError,
 } from "@components/organisms";
 import { Checkout } from "@components/templates";
 import { useCart, useCheckout } from "@saleor/sdk";
@@ -414,6 +417,54 @@ const handlePaymentConfirm = async () => {
 
   setSubmitInProgress(true);
   setPaymentConfirmation(true);
+  /**
+   * Tap webhook completes the checkout on redirect, so wait for the status it publishes
+   * instead of completing the checkout again.
+   */
+  if (
+    payment?.gateway === "tappayment.gosell" &&
+    querystring.payment &&
+    querystring.checkout
+  ) {
+    const tapPayStatus = await subscribeTapPayPaymentStatus(
+      querystring.payment,
+      querystring.checkout
+    );
+    if (tapPayStatus?.order) {
+      const { order } = tapPayStatus;
+      /**
+       * The order page state is kept in browser history, so it survives the reload
+       * that makes the SDK start again with an empty checkout and cart.
+       */
+      clearTapPayCheckoutStorage();
+      history.replace({
+        pathname: "/order-finalized",
+        state: {
+          id: order.id,
+          orderNumber: order.number,
+          token: order.token,
+        },
+      });
+      window.location.reload();
+      return;
+    }
+    if (tapPayStatus && !tapPayStatus.is_success) {
+      setPaymentGatewayErrors([
+        {
+          message: translateTapPayConfirmationError(tapPayStatus.status, intl),
+        },
+      ]);
+      const paymentStepLink = steps.find(
+        step => step.step === CheckoutStep.Payment
+      )?.link;
+      setSubmitInProgress(false);
+      setPaymentConfirmation(false);
+      if (paymentStepLink) {
+        history.push(paymentStepLink);
+      }
+      return;
+    }
+  }
   /**
    * Saleor API creates an order for not fully authorised payments, thus we accept all non negative payment result codes,
    * assuming the payment is completed, what means we can proceed further.
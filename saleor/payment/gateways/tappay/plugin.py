@@ -1,17 +1,15 @@
 # External Apps
 import json
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 from urllib.parse import urlencode
 
-import tappayment as TapPay
-
 # Dejango Apps
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.handlers.wsgi import WSGIRequest
 from django.http import HttpResponse, HttpResponseNotFound
+from django.utils.functional import cached_property
 
 # Saleor Apps
-from ....checkout.models import Checkout
 from ....core.utils import build_absolute_uri
 from ....core.utils.url import prepare_url
 from ....plugins.base_plugin import BasePlugin, ConfigurationTypeField
@@ -24,21 +22,34 @@ from ..utils import get_supported_currencies
 # Plugin App
 from .utils import (
     AUTH_STATUS,
+    CONFIRM_TIER_API,
+    CONFIRM_TIER_CACHE,
+    CONFIRM_TIER_TRANSACTION,
     FAILED_STATUSES,
     PENDING_STATUSES,
+    cache_tap_status,
     call_api_clinet,
     call_capture,
+    get_cached_tap_status,
     init_data_for_payment,
     init_for_payment_void_or_cancel,
     init_for_payment_refund,
+    load_currency_quantizers,
+    record_confirm_tier,
 )
-from .webhooks import handle_additional_actions
+from .profiling import HookProfiler, parse_sample_rate, profile_hook
+
+if TYPE_CHECKING:
+    import tappayment as TapPay
+
+    from ....checkout.models import Checkout
 
 
 
 
 GATEWAY_NAME = "Tappay"
 ADDITIONAL_ACTION_PATH = "/additional-actions"
+PAYMENT_STATUS_PATH = "/payment-status"
 
 
 def require_active_plugin(fn):
@@ -59,6 +70,9 @@ class TapPayGatewayPlugin(BasePlugin):
         {"name": "supported-currencies", "value": ""},
         {"name": "source-id", "value": ""},
         {"name": "auto-capture", "value": False},
+        {"name": "profiling-sample-rate", "value": ""},
+        {"name": "profiling-output-path", "value": ""},
+        {"name": "profiling-header-secret", "value": None},
     ]
 
     CONFIG_STRUCTURE = {
@@ -88,7 +102,31 @@ class TapPayGatewayPlugin(BasePlugin):
                 " funds are blocked but need to be captured manually."
             ),
             "label": "Automatically capture funds when a payment is made",
-        }
+        },
+        "profiling-sample-rate": {
+            "type": ConfigurationTypeField.STRING,
+            "help_text": (
+                "Fraction of plugin hook calls to profile, between 0 and 1."
+                " Leave empty to disable profiling."
+            ),
+            "label": "Profiling sample rate",
+        },
+        "profiling-output-path": {
+            "type": ConfigurationTypeField.STRING,
+            "help_text": (
+                "Path prefix of the files where profiles and SQL query counts are"
+                " written. Defaults to tappay-profile in the working directory."
+            ),
+            "label": "Profiling output path",
+        },
+        "profiling-header-secret": {
+            "type": ConfigurationTypeField.SECRET,
+            "help_text": (
+                "Webhook requests sending this value in the X-TapPay-Profile header"
+                " are always profiled. Leave empty to disable on-demand profiling."
+            ),
+            "label": "Profiling header secret",
+        },
     }
 
     def __init__(self, *args, **kwargs):
@@ -103,17 +141,41 @@ class TapPayGatewayPlugin(BasePlugin):
                 "source-id": configuration["source-id"],
             },
         )
+        self.profiler = HookProfiler(
+            sample_rate=parse_sample_rate(configuration.get("profiling-sample-rate")),
+            output_path=configuration.get("profiling-output-path"),
+            header_secret=configuration.get("profiling-header-secret"),
+        )
+        if self.active:
+            # Build the currency table up front instead of on the first payment
+            load_currency_quantizers()
+
+    @cached_property
+    def tappay(self) -> "TapPay.Client":
+        # The Tap client is imported on first use, so discovering an inactive plugin
+        # doesn't load it in every worker
+        import tappayment as TapPay
+
         api_key = self.config.connection_params["api-key"]
-        self.tappay = TapPay.Client(
+        return TapPay.Client(
             api_token=api_key
         )
 
+    @profile_hook
     def webhook(self, request: WSGIRequest, path: str, previous_value) -> HttpResponse:
         config = self._get_gateway_config()
         if path.startswith(ADDITIONAL_ACTION_PATH):
+            # Webhooks pull in checkout completion and order actions, import them
+            # only when Tap calls us back
+            from .webhooks import handle_additional_actions
+
             return handle_additional_actions(
                 request, self.tappay.payment.get_authorize_status,
             )
+        if path.startswith(PAYMENT_STATUS_PATH):
+            from .status import stream_payment_status
+
+            return stream_payment_status(request)
         return HttpResponseNotFound()
 
     def _get_gateway_config(self) -> GatewayConfig:
@@ -138,6 +200,7 @@ class TapPayGatewayPlugin(BasePlugin):
         )
 
     @require_active_plugin
+    @profile_hook
     def process_payment(
         self, payment_information: "PaymentData", previous_value
     ) -> "GatewayResponse":
@@ -210,23 +273,59 @@ class TapPayGatewayPlugin(BasePlugin):
         config = self._get_gateway_config()
         return get_supported_currencies(config, GATEWAY_NAME)
 
-    def _process_additional_action(self, payment_information: "PaymentData", kind: str):
+    def _get_tap_id(
+        self, payment: Payment, payment_information: "PaymentData"
+    ) -> Optional[str]:
+        if payment_information.token:
+            return payment_information.token
+        additional_data = payment_information.data or {}
+        if additional_data.get("tap_id"):
+            return additional_data["tap_id"]
+        transaction = (
+            payment.transactions.exclude(token__isnull=False, token__exact="")
+            .order_by("pk")
+            .last()
+        )
+        return transaction.token if transaction else None
+
+    def _process_tap_status(
+        self, payment: Payment, payment_information: "PaymentData", kind: str
+    ) -> "GatewayResponse":
+        """Confirm the payment from the charge status stored at Tap.
+
+        The status is taken from the cache filled by the webhook when possible, and
+        fetched once with a read-only call otherwise. The charge is never authorized
+        again.
+        """
         config = self._get_gateway_config()
-        additional_data = payment_information.data
-        if not additional_data:
+        tap_id = self._get_tap_id(payment, payment_information)
+        if not tap_id:
             raise PaymentError("Unable to finish the payment.")
 
-        result = call_api_clinet(additional_data, self.tappay.payment.authorize)
-        result_code = result['status']
+        result = get_cached_tap_status(tap_id)
+        if result is not None:
+            record_confirm_tier(CONFIRM_TIER_CACHE, payment.pk)
+        else:
+            result = call_api_clinet(tap_id, self.tappay.payment.get_authorize_status)
+            cache_tap_status(tap_id, result)
+            record_confirm_tier(CONFIRM_TIER_API, payment.pk)
+
+        result_code = result.get("status", "")
         is_success = result_code not in FAILED_STATUSES
 
         if result_code in PENDING_STATUSES:
             kind = TransactionKind.PENDING
-        elif is_success and config.auto_capture:
+        elif config.auto_capture and result_code == AUTH_STATUS:
             # For enabled auto_capture on Saleor side we need to proceed an additional
-            # action
-            response = self.capture_payment(payment_information, None)
-            is_success = response.is_success
+            # action, the customer for the capture comes from the status we already
+            # have
+            result = call_capture(
+                payment_information=payment_information,
+                token=tap_id,
+                tappay_client=self.tappay,
+                authorize_status=result,
+            )
+            is_success = result.get("status", "") not in FAILED_STATUSES
 
         return GatewayResponse(
             is_success=is_success,
@@ -234,13 +333,14 @@ class TapPayGatewayPlugin(BasePlugin):
             kind=kind,
             amount=payment_information.amount,
             currency=payment_information.currency,
-            transaction_id=result.get("id", ""),
+            transaction_id=result.get("id", tap_id),
             error=result.get("error",""),
             raw_response=result,
-            searchable_key=result.get("id", ""),
+            searchable_key=result.get("id", tap_id),
         )
 
     @require_active_plugin
+    @profile_hook
     def confirm_payment(
         self, payment_information: "PaymentData", previous_value
     ) -> "GatewayResponse":
@@ -268,8 +368,9 @@ class TapPayGatewayPlugin(BasePlugin):
             kind = TransactionKind.CAPTURE
 
         if not transaction:
+            return self._process_tap_status(payment, payment_information, kind)
 
-            return self._process_additional_action(payment_information, kind)
+        record_confirm_tier(CONFIRM_TIER_TRANSACTION, payment.pk)
 
         result_code = transaction.gateway_response.get("status", "")
         if result_code in PENDING_STATUSES:
@@ -288,14 +389,20 @@ class TapPayGatewayPlugin(BasePlugin):
         ).first()
         is_success = True
 
-        # confirm that we should proceed the capture action
+        # confirm that we should proceed the capture action, the status recorded by
+        # the webhook already has the customer needed for the capture
         if (
             not transaction_already_processed
             and config.auto_capture
             and kind == TransactionKind.CAPTURE
         ):
-            response = self.capture_payment(payment_information, None)
-            is_success = response.is_success
+            capture_result = call_capture(
+                payment_information=payment_information,
+                token=transaction.token,
+                tappay_client=self.tappay,
+                authorize_status=transaction.gateway_response,
+            )
+            is_success = capture_result.get("status", "") not in FAILED_STATUSES
 
         token = transaction.token
         if transaction_already_processed:
@@ -314,6 +421,7 @@ class TapPayGatewayPlugin(BasePlugin):
         )
 
     @require_active_plugin
+    @profile_hook
     def refund_payment(
         self, payment_information: "PaymentData", previous_value
     ) -> "GatewayResponse":
@@ -363,6 +471,7 @@ class TapPayGatewayPlugin(BasePlugin):
         )
 
     @require_active_plugin
+    @profile_hook
     def capture_payment(
         self, payment_information: "PaymentData", previous_value
     ) -> "GatewayResponse":
@@ -389,6 +498,7 @@ class TapPayGatewayPlugin(BasePlugin):
         )
 
     @require_active_plugin
+    @profile_hook
     def void_payment(
         self, payment_information: "PaymentData", previous_value
     ) -> "GatewayResponse":
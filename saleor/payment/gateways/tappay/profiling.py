@@ -0,0 +1,219 @@
+import atexit
+import hmac
+import json
+import logging
+import os
+import random
+import threading
+import time
+from functools import wraps
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from django.db import connection
+
+if TYPE_CHECKING:
+    import cProfile
+    import pstats
+
+logger = logging.getLogger(__name__)
+
+
+PROFILE_HEADER = "X-TapPay-Profile"
+DEFAULT_OUTPUT_PATH = "tappay-profile"
+TOP_STACKS_LIMIT = 25
+# Aggregated profiles are rewritten at most this often, in seconds
+STATS_DUMP_INTERVAL = 60
+# Sampled calls stop being logged once the JSON lines file reaches this size
+MAX_LOG_SIZE = 50 * 1024 * 1024
+
+# Saleor creates new plugin instances for every request, so the aggregated stats
+# and the nesting flag live at module level, keyed by output path and hook name
+_aggregated_stats: Dict[Tuple[str, str], "pstats.Stats"] = {}
+_last_dumps: Dict[Tuple[str, str], float] = {}
+_aggregated_stats_lock = threading.Lock()
+_local = threading.local()
+
+
+def parse_sample_rate(value: Any) -> float:
+    if value in (None, ""):
+        return 0.0
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        logger.warning("Invalid TapPay profiling sample rate %r, disabling.", value)
+        return 0.0
+    return min(max(rate, 0.0), 1.0)
+
+
+class QueryCounter:
+    """Count SQL queries executed through Django's default connection."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class HookProfiler:
+    """Profile a sampled fraction of plugin hook invocations.
+
+    Webhook calls can also be profiled on demand by sending the ``header_secret``
+    from the plugin configuration in the ``X-TapPay-Profile`` header.
+
+    Every sampled call appends a JSON line with the hook name, its duration and
+    the number of SQL queries to ``<output_path>.jsonl``. Profiler stats are
+    aggregated per hook for the lifetime of the process and dumped, at most once a
+    minute and on exit, to ``<output_path>.<hook>.<pid>.prof`` so they can be
+    inspected with ``pstats`` or ``snakeviz``.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        output_path: Optional[str] = None,
+        header_secret: Optional[str] = None,
+    ):
+        self.sample_rate = sample_rate
+        self.header_secret = header_secret or ""
+        self.output_path = output_path or DEFAULT_OUTPUT_PATH
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def is_requested(self, request) -> bool:
+        if not self.header_secret or request is None:
+            return False
+        value = request.headers.get(PROFILE_HEADER, "")
+        return hmac.compare_digest(value.encode(), self.header_secret.encode())
+
+    def should_profile(self, request=None) -> bool:
+        # Nested hooks (e.g. confirm_payment calling capture_payment) are already
+        # covered by the outer profile
+        if getattr(_local, "active", False):
+            return False
+        if self.is_requested(request):
+            return True
+        return self.enabled and random.random() < self.sample_rate
+
+    def run(self, hook_name: str, fn: Callable, *args, **kwargs):
+        # Profiling is off by default, don't load the profiler until it's needed
+        import cProfile
+
+        profiler = cProfile.Profile()
+        counter = QueryCounter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this interpreter
+            return fn(*args, **kwargs)
+        _local.active = True
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(counter):
+                return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start
+            _local.active = False
+            try:
+                self._record(hook_name, profiler, counter.count, duration)
+            except OSError as e:
+                logger.warning("Unable to write TapPay profile for %s: %s", hook_name, e)
+
+    def _record(
+        self,
+        hook_name: str,
+        profiler: "cProfile.Profile",
+        queries: int,
+        duration: float,
+    ):
+        import pstats
+
+        stats = pstats.Stats(profiler)
+        entry = {
+            "hook": hook_name,
+            "timestamp": time.time(),
+            "pid": os.getpid(),
+            "duration_ms": round(duration * 1000, 3),
+            "sql_queries": queries,
+            "top_stacks": get_top_stacks(stats),
+        }
+        key = (self.output_path, hook_name)
+        now = time.monotonic()
+        with _aggregated_stats_lock:
+            aggregated = _aggregated_stats.get(key)
+            if aggregated is None:
+                _aggregated_stats[key] = aggregated = stats
+            else:
+                aggregated.add(stats)
+            last_dump = _last_dumps.get(key)
+            if last_dump is None or now - last_dump >= STATS_DUMP_INTERVAL:
+                _last_dumps[key] = now
+                dump_stats(key, aggregated)
+        write_log_entry(f"{self.output_path}.jsonl", entry)
+
+
+def get_stats_path(output_path: str, hook_name: str) -> str:
+    # Every worker aggregates its own calls, so every worker gets its own file
+    return f"{output_path}.{hook_name}.{os.getpid()}.prof"
+
+
+def dump_stats(key: Tuple[str, str], stats: "pstats.Stats"):
+    path = get_stats_path(*key)
+    tmp_path = f"{path}.tmp"
+    stats.dump_stats(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_log_entry(path: str, entry: Dict[str, Any]):
+    try:
+        if os.path.getsize(path) >= MAX_LOG_SIZE:
+            return
+    except FileNotFoundError:
+        pass
+    with open(path, "a") as output:
+        output.write(json.dumps(entry) + "\n")
+
+
+@atexit.register
+def dump_all_stats():
+    with _aggregated_stats_lock:
+        for key, stats in _aggregated_stats.items():
+            try:
+                dump_stats(key, stats)
+            except OSError as e:
+                logger.warning("Unable to write TapPay profile %s: %s", key, e)
+
+
+def get_top_stacks(stats: "pstats.Stats", limit: int = TOP_STACKS_LIMIT) -> List[Dict]:
+    rows = []
+    for (filename, line, name), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append(
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": ncalls,
+                "tottime_ms": round(tottime * 1000, 3),
+                "cumtime_ms": round(cumtime * 1000, 3),
+            }
+        )
+    rows.sort(key=lambda row: row["cumtime_ms"], reverse=True)
+    return rows[:limit]
+
+
+def profile_hook(fn):
+    hook_name = fn.__name__
+
+    @wraps(fn)
+    def wrapped(self, *args, **kwargs):
+        profiler = getattr(self, "profiler", None)
+        request = None
+        if hook_name == "webhook":
+            request = args[0] if args else kwargs.get("request")
+        if profiler is None or not profiler.should_profile(request):
+            return fn(self, *args, **kwargs)
+        return profiler.run(hook_name, fn, self, *args, **kwargs)
+
+    return wrapped
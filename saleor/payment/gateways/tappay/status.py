@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotFound, StreamingHttpResponse
+from django.http.request import split_domain_port, validate_host
+from django.utils.module_loading import import_string
+from graphql_relay import from_global_id
+
+STATUS_RETENTION = 300
+# The webhook publishes before redirecting to the storefront, so the status is
+# usually there on the first read; keep workers waiting only briefly otherwise
+STATUS_STREAM_TIMEOUT = 5
+CACHE_POLL_INTERVAL = 0.25
+STATUS_CACHE_KEY = "tappay:payment-status:{}"
+
+
+class InProcessStatusBackend:
+    """Keep the latest status of every channel in this process.
+
+    Subscribers block on a condition until a status is published, so the webhook and
+    the stream have to be served by the same process. Only suitable for a single
+    worker deployment, e.g. local development.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._statuses: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def publish(self, channel: str, message: Dict[str, Any]):
+        with self._condition:
+            now = time.monotonic()
+            self._statuses = {
+                key: value
+                for key, value in self._statuses.items()
+                if now - value[0] < STATUS_RETENTION
+            }
+            self._statuses[channel] = (now, message)
+            self._condition.notify_all()
+
+    def _get(self, channel: str) -> Optional[Dict[str, Any]]:
+        status = self._statuses.get(channel)
+        if status and time.monotonic() - status[0] < STATUS_RETENTION:
+            return status[1]
+        return None
+
+    def wait(self, channel: str, timeout: float) -> Optional[Dict[str, Any]]:
+        with self._condition:
+            self._condition.wait_for(lambda: self._get(channel), timeout=timeout)
+            return self._get(channel)
+
+
+def is_cache_shared() -> bool:
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+class CacheStatusBackend:
+    """Share statuses between workers through the Django cache.
+
+    This is the default backend and it needs a cache shared by all workers, such as
+    Redis or Memcached. An already published status is returned without waiting,
+    otherwise the cache is polled until the timeout. With the per-process locmem
+    cache a status published by another worker can never show up, so it's read
+    once without waiting.
+    """
+
+    def publish(self, channel: str, message: Dict[str, Any]):
+        cache.set(STATUS_CACHE_KEY.format(channel), message, STATUS_RETENTION)
+
+    def wait(self, channel: str, timeout: float) -> Optional[Dict[str, Any]]:
+        if not is_cache_shared():
+            timeout = 0
+        deadline = time.monotonic() + timeout
+        while True:
+            message = cache.get(STATUS_CACHE_KEY.format(channel))
+            if message is not None or time.monotonic() >= deadline:
+                return message
+            time.sleep(CACHE_POLL_INTERVAL)
+
+
+@lru_cache(maxsize=None)
+def get_status_backend():
+    backend_path = getattr(settings, "TAPPAY_STATUS_BACKEND", None)
+    if not backend_path:
+        return CacheStatusBackend()
+    return import_string(backend_path)()
+
+
+def get_status_channel(payment_id: str, checkout_token: str) -> str:
+    return f"{payment_id}:{checkout_token}"
+
+
+def publish_payment_status(
+    payment_id: str, checkout_token: str, message: Dict[str, Any]
+):
+    # Subscribers act on the status right away, so it can't be visible before the
+    # transaction that stored the payment result is committed
+    channel = get_status_channel(payment_id, checkout_token)
+    transaction.on_commit(lambda: get_status_backend().publish(channel, message))
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_events(channel: str) -> Iterator[str]:
+    message = get_status_backend().wait(channel, timeout=STATUS_STREAM_TIMEOUT)
+    if message is None:
+        yield format_event("timeout", {})
+    else:
+        yield format_event("status", message)
+
+
+def stream_payment_status(request: WSGIRequest) -> HttpResponse:
+    """Send the final payment status as a single Server-Sent Event.
+
+    The channel is identified by the ``payment`` and ``checkout`` parameters that
+    Saleor adds to the return URL. When no status is published before the timeout
+    a ``timeout`` event is sent and the client may subscribe again.
+    """
+    payment_id = request.GET.get("payment")
+    checkout_id = request.GET.get("checkout")
+    if not payment_id or not checkout_id:
+        return HttpResponseNotFound()
+    try:
+        node_type, checkout_token = from_global_id(checkout_id)
+    except (UnicodeDecodeError, ValueError):
+        return HttpResponseNotFound()
+    if node_type != "Checkout" or not checkout_token:
+        return HttpResponseNotFound()
+
+    channel = get_status_channel(payment_id, checkout_token)
+    response = StreamingHttpResponse(
+        stream_events(channel), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    allowed_origin = get_allowed_origin(request)
+    if allowed_origin:
+        response["Access-Control-Allow-Origin"] = allowed_origin
+        response["Vary"] = "Origin"
+    return response
+
+
+def get_allowed_origin(request: WSGIRequest) -> Optional[str]:
+    """Return the request origin if it's one of the storefronts Saleor accepts.
+
+    Uses ``ALLOWED_CLIENT_HOSTS``, the same setting Saleor validates storefront
+    URLs against.
+    """
+    origin = request.headers.get("Origin")
+    if not origin:
+        return None
+    domain, _ = split_domain_port(urlparse(origin).netloc)
+    if not domain or not validate_host(
+        domain, getattr(settings, "ALLOWED_CLIENT_HOSTS", [])
+    ):
+        return None
+    return origin
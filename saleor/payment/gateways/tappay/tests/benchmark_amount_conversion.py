@@ -0,0 +1,56 @@
+"""Compare get_amount_for_tappay with the conversion it replaced.
+
+Not part of the test suite, run it in the Saleor API root with:
+
+    python -m saleor.payment.gateways.tappay.tests.benchmark_amount_conversion
+"""
+import os
+import random
+import timeit
+from decimal import Decimal
+
+AMOUNTS_COUNT = 1000
+NUMBER = 20
+REPEAT = 5
+
+
+def legacy_get_amount_for_tappay(amount: Decimal) -> int:
+    # Conversion used before the currency quantizer table
+    return int(Decimal(amount).quantize(Decimal(".000")))
+
+
+def main():
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "saleor.settings")
+    django.setup()
+
+    from ..utils import get_amount_for_tappay, load_currency_quantizers
+
+    load_currency_quantizers()
+    rng = random.Random(1234)
+    amounts = [
+        Decimal(rng.randint(0, 10 ** 9)).scaleb(-rng.randint(0, 6))
+        for _ in range(AMOUNTS_COUNT)
+    ]
+
+    legacy = min(
+        timeit.repeat(
+            lambda: [legacy_get_amount_for_tappay(amount) for amount in amounts],
+            number=NUMBER,
+            repeat=REPEAT,
+        )
+    )
+    current = min(
+        timeit.repeat(
+            lambda: [get_amount_for_tappay(amount, "KWD") for amount in amounts],
+            number=NUMBER,
+            repeat=REPEAT,
+        )
+    )
+    print(f"legacy:  {legacy:.4f}s")
+    print(f"current: {current:.4f}s ({current / legacy:.0%} of legacy)")
+
+
+if __name__ == "__main__":
+    main()
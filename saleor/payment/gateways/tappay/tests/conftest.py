@@ -0,0 +1,31 @@
+from unittest.mock import Mock
+
+import pytest
+from django.core.cache import cache
+
+from ..plugin import TapPayGatewayPlugin
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def tappay_plugin():
+    def fun(auto_capture=False):
+        plugin = TapPayGatewayPlugin(
+            configuration=[
+                {"name": "api-key", "value": "sk_test"},
+                {"name": "supported-currencies", "value": "USD,KWD"},
+                {"name": "source-id", "value": "src_all"},
+                {"name": "auto-capture", "value": auto_capture},
+            ],
+            active=True,
+        )
+        plugin.tappay = Mock()
+        return plugin
+
+    return fun
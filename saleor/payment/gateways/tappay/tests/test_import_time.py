@@ -0,0 +1,61 @@
+"""Guard against the plugin import loading modules only its hooks need.
+
+The plugin module is imported under ``python -X importtime`` and the test fails
+when any of ``LAZY_MODULES`` shows up among the modules it loads. Import times are
+not asserted, they vary too much between machines.
+"""
+import subprocess
+import sys
+
+PLUGIN_MODULE = "saleor.payment.gateways.tappay.plugin"
+SETUP_DONE_MARKER = "tappay-import-time: django ready"
+# Loaded only when a Tap hook runs
+LAZY_MODULES = [
+    "tappayment",
+    "saleor.checkout.complete_checkout",
+    "saleor.order.actions",
+    "saleor.discount.utils",
+]
+
+IMPORT_SCRIPT = f"""
+import sys
+import django
+
+django.setup()
+print({SETUP_DONE_MARKER!r}, file=sys.stderr, flush=True)
+import {PLUGIN_MODULE}
+"""
+
+
+def get_plugin_imports():
+    """Return the names of the modules loaded by the plugin import.
+
+    Django is set up first, so modules Saleor loads by itself are not attributed to
+    the plugin.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    lines = result.stderr.splitlines()
+    lines = lines[lines.index(SETUP_DONE_MARKER) + 1 :]
+    imports = set()
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit():
+            # Header line
+            continue
+        imports.add(module.strip())
+    return imports
+
+
+def test_plugin_import_does_not_load_hook_dependencies():
+    modules = get_plugin_imports()
+
+    assert PLUGIN_MODULE in modules
+    for module in LAZY_MODULES:
+        assert module not in modules, f"{module} is imported with the plugin"
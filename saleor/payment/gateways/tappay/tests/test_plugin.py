@@ -0,0 +1,120 @@
+from ... import TransactionKind
+from ...utils import create_payment_information
+from ..utils import cache_tap_status, get_cached_tap_status
+
+TAP_ID = "chg_TS0123456789"
+
+
+def create_tap_transaction(payment, kind, token, status="AUTHORIZED"):
+    return payment.transactions.create(
+        kind=kind,
+        token=token,
+        is_success=True,
+        action_required=False,
+        amount=payment.total,
+        currency=payment.currency,
+        gateway_response={"id": token, "status": status, "customer": {"id": "cus_1"}},
+    )
+
+
+def test_confirm_payment_from_webhook_transaction(payment_dummy, tappay_plugin):
+    plugin = tappay_plugin()
+    create_tap_transaction(payment_dummy, TransactionKind.ACTION_TO_CONFIRM, TAP_ID)
+    payment_info = create_payment_information(payment_dummy)
+
+    response = plugin.confirm_payment(payment_info, None)
+
+    assert response.is_success
+    assert response.kind == TransactionKind.AUTH
+    assert response.transaction_id == TAP_ID
+    assert plugin.tappay.payment.method_calls == []
+
+
+def test_confirm_payment_from_cached_status(payment_dummy, tappay_plugin):
+    plugin = tappay_plugin()
+    cache_tap_status(TAP_ID, {"id": TAP_ID, "status": "AUTHORIZED"})
+    payment_info = create_payment_information(payment_dummy, payment_token=TAP_ID)
+
+    response = plugin.confirm_payment(payment_info, None)
+
+    assert response.is_success
+    assert response.kind == TransactionKind.AUTH
+    assert response.transaction_id == TAP_ID
+    assert plugin.tappay.payment.method_calls == []
+
+
+def test_confirm_payment_fetches_status_once(payment_dummy, tappay_plugin):
+    plugin = tappay_plugin()
+    status = {"id": TAP_ID, "status": "AUTHORIZED"}
+    plugin.tappay.payment.get_authorize_status.return_value = status
+    payment_info = create_payment_information(payment_dummy, payment_token=TAP_ID)
+
+    response = plugin.confirm_payment(payment_info, None)
+
+    assert response.is_success
+    assert response.transaction_id == TAP_ID
+    plugin.tappay.payment.get_authorize_status.assert_called_once_with(TAP_ID)
+    plugin.tappay.payment.authorize.assert_not_called()
+    assert get_cached_tap_status(TAP_ID) == status
+
+
+def test_confirm_payment_failed_status(payment_dummy, tappay_plugin):
+    plugin = tappay_plugin(auto_capture=True)
+    plugin.tappay.payment.get_authorize_status.return_value = {
+        "id": TAP_ID,
+        "status": "DECLINED",
+    }
+    payment_info = create_payment_information(payment_dummy, payment_token=TAP_ID)
+
+    response = plugin.confirm_payment(payment_info, None)
+
+    assert not response.is_success
+    plugin.tappay.payment.authorize.assert_not_called()
+    plugin.tappay.payment.authorize_capture.assert_not_called()
+
+
+def test_confirm_payment_auto_capture_uses_known_status(payment_dummy, tappay_plugin):
+    plugin = tappay_plugin(auto_capture=True)
+    cache_tap_status(
+        TAP_ID, {"id": TAP_ID, "status": "AUTHORIZED", "customer": {"id": "cus_1"}}
+    )
+    capture_result = {"id": "chg_captured", "status": "CAPTURED"}
+    plugin.tappay.payment.authorize_capture.return_value = capture_result
+    payment_info = create_payment_information(payment_dummy, payment_token=TAP_ID)
+
+    response = plugin.confirm_payment(payment_info, None)
+
+    assert response.is_success
+    assert response.kind == TransactionKind.CAPTURE
+    assert response.transaction_id == "chg_captured"
+    assert response.raw_response == capture_result
+    plugin.tappay.payment.get_authorize_status.assert_not_called()
+    plugin.tappay.payment.authorize.assert_not_called()
+    request = plugin.tappay.payment.authorize_capture.call_args[0][0]
+    assert request["customer"] == {"id": "cus_1"}
+    assert request["source"] == {"id": TAP_ID}
+
+
+def test_confirm_payment_auto_capture_skips_captured_status(
+    payment_dummy, tappay_plugin
+):
+    plugin = tappay_plugin(auto_capture=True)
+    cache_tap_status(TAP_ID, {"id": TAP_ID, "status": "CAPTURED"})
+    payment_info = create_payment_information(payment_dummy, payment_token=TAP_ID)
+
+    response = plugin.confirm_payment(payment_info, None)
+
+    assert response.is_success
+    plugin.tappay.payment.authorize_capture.assert_not_called()
+
+
+def test_get_tap_id_falls_back_to_last_transaction_with_token(
+    payment_dummy, tappay_plugin
+):
+    plugin = tappay_plugin()
+    create_tap_transaction(payment_dummy, TransactionKind.AUTH, "chg_first")
+    create_tap_transaction(payment_dummy, TransactionKind.PENDING, "chg_last")
+    create_tap_transaction(payment_dummy, TransactionKind.PENDING, "")
+    payment_info = create_payment_information(payment_dummy)
+
+    assert plugin._get_tap_id(payment_dummy, payment_info) == "chg_last"
@@ -0,0 +1,132 @@
+import json
+import os
+from unittest.mock import Mock, patch
+
+import pytest
+from django.db import connection
+
+from .. import profiling
+from ..profiling import (
+    PROFILE_HEADER,
+    HookProfiler,
+    get_stats_path,
+    parse_sample_rate,
+    profile_hook,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_profiler_state():
+    yield
+    profiling._aggregated_stats.clear()
+    profiling._last_dumps.clear()
+    profiling._local.active = False
+
+
+def get_request(header=None):
+    headers = {PROFILE_HEADER: header} if header is not None else {}
+    return Mock(headers=headers)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, 0.0),
+        ("", 0.0),
+        ("0.25", 0.25),
+        ("1", 1.0),
+        ("5", 1.0),
+        ("-1", 0.0),
+        ("not-a-number", 0.0),
+    ],
+)
+def test_parse_sample_rate(value, expected):
+    assert parse_sample_rate(value) == expected
+
+
+def test_should_profile_disabled():
+    assert not HookProfiler(sample_rate=0).should_profile()
+
+
+@patch("saleor.payment.gateways.tappay.profiling.random.random")
+def test_should_profile_sampling(random_mock):
+    profiler = HookProfiler(sample_rate=0.1)
+
+    random_mock.return_value = 0.05
+    assert profiler.should_profile()
+
+    random_mock.return_value = 0.5
+    assert not profiler.should_profile()
+
+
+def test_should_profile_header_with_secret():
+    profiler = HookProfiler(header_secret="s3cret")
+
+    assert profiler.should_profile(get_request("s3cret"))
+    assert not profiler.should_profile(get_request("wrong"))
+    assert not profiler.should_profile(get_request())
+
+
+def test_should_profile_header_ignored_without_secret():
+    profiler = HookProfiler()
+
+    assert not profiler.should_profile(get_request(""))
+    assert not profiler.should_profile(get_request("1"))
+
+
+def test_should_profile_skips_nested_hooks():
+    profiler = HookProfiler(sample_rate=1)
+    profiling._local.active = True
+
+    assert not profiler.should_profile()
+
+
+def test_run_records_queries_and_stats(db, tmp_path):
+    output_path = str(tmp_path / "profile")
+    profiler = HookProfiler(sample_rate=1, output_path=output_path)
+
+    def hook(value):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.execute("SELECT 2")
+        return value
+
+    assert profiler.run("process_payment", hook, "result") == "result"
+
+    with open(f"{output_path}.jsonl") as log:
+        entries = [json.loads(line) for line in log]
+    assert len(entries) == 1
+    assert entries[0]["hook"] == "process_payment"
+    assert entries[0]["sql_queries"] == 2
+    assert entries[0]["top_stacks"]
+    assert os.path.exists(get_stats_path(output_path, "process_payment"))
+
+
+def test_run_throttles_stats_dump(tmp_path):
+    output_path = str(tmp_path / "profile")
+    profiler = HookProfiler(sample_rate=1, output_path=output_path)
+
+    with patch("saleor.payment.gateways.tappay.profiling.dump_stats") as dump_mock:
+        profiler.run("void_payment", lambda: None)
+        profiler.run("void_payment", lambda: None)
+
+    dump_mock.assert_called_once()
+
+
+def test_profile_hook_reads_request_from_kwargs(tmp_path):
+    class Plugin:
+        profiler = HookProfiler(
+            header_secret="s3cret", output_path=str(tmp_path / "profile")
+        )
+
+        @profile_hook
+        def webhook(self, request, path, previous_value):
+            return path
+
+    with patch.object(HookProfiler, "run", return_value="profiled") as run_mock:
+        result = Plugin().webhook(
+            request=get_request("s3cret"), path="/", previous_value=None
+        )
+
+    assert result == "profiled"
+    run_mock.assert_called_once()
@@ -0,0 +1,111 @@
+from unittest.mock import patch
+
+import graphene
+import pytest
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from ..status import (
+    CacheStatusBackend,
+    get_status_channel,
+    publish_payment_status,
+    stream_payment_status,
+)
+
+PAYMENT_ID = graphene.Node.to_global_id("Payment", 1)
+CHECKOUT_TOKEN = "2b7b9c25-7a2c-4a39-9b64-8c8c7a7b9f27"
+CHECKOUT_ID = graphene.Node.to_global_id("Checkout", CHECKOUT_TOKEN)
+CHANNEL = get_status_channel(PAYMENT_ID, CHECKOUT_TOKEN)
+MESSAGE = {"status": "CAPTURED", "is_success": True, "order": None}
+
+
+@pytest.fixture
+def shared_cache():
+    with patch(
+        "saleor.payment.gateways.tappay.status.is_cache_shared", return_value=True
+    ):
+        yield
+
+
+@pytest.mark.django_db(transaction=True)
+def test_publish_payment_status_waits_for_commit():
+    backend = CacheStatusBackend()
+
+    with transaction.atomic():
+        publish_payment_status(PAYMENT_ID, CHECKOUT_TOKEN, MESSAGE)
+        assert backend.wait(CHANNEL, timeout=0) is None
+
+    assert backend.wait(CHANNEL, timeout=0) == MESSAGE
+
+
+@patch("saleor.payment.gateways.tappay.status.time.sleep")
+def test_cache_backend_returns_published_status_immediately(sleep_mock, shared_cache):
+    backend = CacheStatusBackend()
+    backend.publish(CHANNEL, MESSAGE)
+
+    assert backend.wait(CHANNEL, timeout=5) == MESSAGE
+    sleep_mock.assert_not_called()
+
+
+@patch("saleor.payment.gateways.tappay.status.CACHE_POLL_INTERVAL", 0.01)
+def test_cache_backend_times_out(shared_cache):
+    assert CacheStatusBackend().wait(CHANNEL, timeout=0.05) is None
+
+
+@patch(
+    "saleor.payment.gateways.tappay.status.caches",
+    {DEFAULT_CACHE_ALIAS: LocMemCache("tappay-test", {})},
+)
+@patch("saleor.payment.gateways.tappay.status.time.sleep")
+def test_cache_backend_does_not_poll_locmem_cache(sleep_mock):
+    assert CacheStatusBackend().wait(CHANNEL, timeout=5) is None
+    sleep_mock.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"payment": PAYMENT_ID},
+        {"checkout": CHECKOUT_ID},
+        {"payment": PAYMENT_ID, "checkout": "not-a-global-id"},
+        {"payment": PAYMENT_ID, "checkout": PAYMENT_ID},
+    ],
+)
+def test_stream_payment_status_rejects_invalid_ids(params, rf):
+    request = rf.get("/plugins/tappayment.gosell/payment-status", params)
+
+    response = stream_payment_status(request)
+
+    assert response.status_code == 404
+
+
+def test_stream_payment_status_sends_published_status(rf, settings):
+    settings.ALLOWED_CLIENT_HOSTS = ["shop.example.com"]
+    CacheStatusBackend().publish(CHANNEL, MESSAGE)
+    request = rf.get(
+        "/plugins/tappayment.gosell/payment-status",
+        {"payment": PAYMENT_ID, "checkout": CHECKOUT_ID},
+        HTTP_ORIGIN="https://shop.example.com",
+    )
+
+    response = stream_payment_status(request)
+
+    content = b"".join(response.streaming_content).decode()
+    assert content.startswith("event: status\n")
+    assert '"status": "CAPTURED"' in content
+    assert response["Access-Control-Allow-Origin"] == "https://shop.example.com"
+
+
+def test_stream_payment_status_no_cors_for_unknown_origin(rf, settings):
+    settings.ALLOWED_CLIENT_HOSTS = ["shop.example.com"]
+    request = rf.get(
+        "/plugins/tappayment.gosell/payment-status",
+        {"payment": PAYMENT_ID, "checkout": CHECKOUT_ID},
+        HTTP_ORIGIN="https://evil.example.com",
+    )
+
+    response = stream_payment_status(request)
+
+    assert "Access-Control-Allow-Origin" not in response
@@ -0,0 +1,46 @@
+import random
+from decimal import Decimal
+
+import pytest
+from babel.numbers import get_currency_precision, list_currencies
+
+from ..utils import get_amount_for_tappay
+
+
+def get_sample_amounts(count=50, seed=1234):
+    rng = random.Random(seed)
+    return [
+        Decimal(rng.randint(0, 10 ** 9)).scaleb(-rng.randint(0, 6))
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("currency", sorted(list_currencies()))
+def test_get_amount_for_tappay_rounds_to_currency_precision(currency):
+    precision = get_currency_precision(currency)
+    half_unit = Decimal(1).scaleb(-precision) / 2
+    for amount in get_sample_amounts():
+        converted = Decimal(str(get_amount_for_tappay(amount, currency)))
+
+        assert converted == converted.quantize(Decimal(1).scaleb(-precision))
+        assert abs(converted - amount) <= half_unit
+
+
+@pytest.mark.parametrize(
+    "currency, amount, expected",
+    [
+        ("KWD", "10.5", 10.5),
+        ("KWD", "12.3456", 12.346),
+        ("BHD", "0.0004", 0.0),
+        ("BHD", "7.1235", 7.124),
+        ("OMR", "99.9999", 100.0),
+        ("OMR", "1.001", 1.001),
+        ("JPY", "1234.5", 1235.0),
+        ("JPY", "1234.4", 1234.0),
+        ("USD", "1.005", 1.01),
+        ("USD", "20", 20.0),
+        ("XYZ", "1.005", 1.01),
+    ],
+)
+def test_get_amount_for_tappay(currency, amount, expected):
+    assert get_amount_for_tappay(Decimal(amount), currency) == expected
@@ -1,16 +1,17 @@
 import json
 import logging
-from decimal import Decimal
-from typing import Any, Callable, Dict, Optional
+from decimal import ROUND_HALF_UP, Decimal
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
 
-import tappayment as TapPay
-
-from babel.numbers import get_currency_precision
+from django.core.cache import cache
 
 from ....payment.models import Payment
 from ... import PaymentError
 from ...interface import PaymentData
 
+if TYPE_CHECKING:
+    import tappayment as TapPay
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,12 +19,50 @@ FAILED_STATUSES = ["REFUSID", "ABANDONED", "CANCELLED","FAILED","DECLINED","REST
 PENDING_STATUSES = ["INITIATED"]
 AUTH_STATUS = "AUTHORIZED"
 
-def get_amount_for_tappay(amount: Decimal) -> int:
+TAP_STATUS_CACHE_KEY = "tappay:status:{}"
+TAP_STATUS_CACHE_TIMEOUT = 30
+
+CONFIRM_TIER_TRANSACTION = "transaction"
+CONFIRM_TIER_CACHE = "cache"
+CONFIRM_TIER_API = "api"
+
+DEFAULT_CURRENCY_QUANTIZER = Decimal("0.01")
+
+# Smallest unit of every currency (e.g. 0.01 for USD, 0.001 for KWD, 1 for JPY)
+currency_quantizers: Dict[str, Decimal] = {}
+
+
+def load_currency_quantizers() -> Dict[str, Decimal]:
+    """Build the currency quantizer table from babel once.
+
+    It's loaded when an active plugin is initialized, or on the first conversion,
+    so inactive plugins don't pay for it.
+    """
+    if not currency_quantizers:
+        from babel.numbers import get_currency_precision, list_currencies
+
+        currency_quantizers.update(
+            {
+                currency: Decimal(1).scaleb(-get_currency_precision(currency))
+                for currency in list_currencies()
+            }
+        )
+    return currency_quantizers
+
+
+def get_amount_for_tappay(amount: Decimal, currency: str) -> float:
+    """Return the amount rounded to the minor unit of the currency.
+
+    Tap expects amounts in the major unit, so 10.5 KWD is sent as 10.5 and
+    not truncated to 10.
+    """
+    quantizer = currency_quantizers.get(currency) or load_currency_quantizers().get(
+        currency, DEFAULT_CURRENCY_QUANTIZER
+    )
+    return float(amount.quantize(quantizer, rounding=ROUND_HALF_UP))
 
-    a =  Decimal(amount).quantize(Decimal('.000'))
-    return int(a)
 
-def call_api_clinet(request_data: Optional[Dict[str, Any]], method: Callable) -> TapPay.Client:
+def call_api_clinet(request_data: Optional[Dict[str, Any]], method: Callable) -> "TapPay.Client":
     try:
         return method(request_data)
     except (ValueError, TypeError) as e:
@@ -48,7 +87,9 @@ def init_data_for_payment(
         extra_request_params["billingAddress"] = payment_data["billingAddress"]
 
     request_data = {
-        "amount": get_amount_for_tappay(payment_information.amount),
+        "amount": get_amount_for_tappay(
+            payment_information.amount, payment_information.currency
+        ),
         "currency": payment_information.currency,
         "customer": {
                "email": payment_information.customer_email,
@@ -69,7 +110,9 @@ def init_for_payment_refund(
     return {
         "charge_id": payment_information.token,
         "currency": payment_information.currency,
-        "amount": get_amount_for_tappay(payment_information.amount),
+        "amount": get_amount_for_tappay(
+            payment_information.amount, payment_information.currency
+        ),
         "reason": "reason",
     }
 
@@ -79,7 +122,9 @@ def request_for_payment_authorize_capture(
 ) -> Dict[str, Any]:
     return {
         "currency": payment_information.currency,
-        "amount": get_amount_for_tappay(payment_information.amount),
+        "amount": get_amount_for_tappay(
+            payment_information.amount, payment_information.currency
+        ),
         "customer": {
             "id": customer_id,
         },
@@ -91,18 +136,21 @@ def request_for_payment_authorize_capture(
 def call_capture(
     payment_information: "PaymentData",
     token: str,
-    tappay_client: TapPay.Client,
+    tappay_client: "TapPay.Client",
+    authorize_status: Optional[Dict[str, Any]] = None,
 ):
+    # The capture needs the customer of the authorization, fetch its status only
+    # when the caller doesn't already have it
     authorize_id = token
-    try:
-        result = call_api_clinet(authorize_id, tappay_client.payment.get_authorize_status)
-    except (ValueError, TypeError) as e:
-        logger.warning(f"Unable to process the payment: {e}")
-        raise PaymentError("Unable to process the payment request.")
-    customer = result.get("customer")
-
-    if "id" in customer:
-        customer_id = customer.get("id")
+    if authorize_status is None:
+        try:
+            authorize_status = call_api_clinet(
+                authorize_id, tappay_client.payment.get_authorize_status
+            )
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Unable to process the payment: {e}")
+            raise PaymentError("Unable to process the payment request.")
+    customer_id = (authorize_status.get("customer") or {}).get("id")
     request = request_for_payment_authorize_capture(
         payment_information=payment_information,
         customer_id=customer_id,
@@ -115,4 +163,25 @@ def init_for_payment_void_or_cancel(
 ):
     return {
         "authorize_id": token,
-    }
\ No newline at end of file
+    }
+
+
+def get_cached_tap_status(tap_id: str) -> Optional[Dict[str, Any]]:
+    return cache.get(TAP_STATUS_CACHE_KEY.format(tap_id))
+
+
+def cache_tap_status(tap_id: str, response: Dict[str, Any]):
+    if not tap_id or not response:
+        return
+    cache.set(TAP_STATUS_CACHE_KEY.format(tap_id), response, TAP_STATUS_CACHE_TIMEOUT)
+
+
+def record_confirm_tier(tier: str, payment_id: int):
+    # The tappay_confirm_tier field is the metric for how confirm_payment resolves,
+    # aggregate it in the log pipeline
+    logger.info(
+        "TapPay confirm_payment for payment %s resolved from %s",
+        payment_id,
+        tier,
+        extra={"tappay_confirm_tier": tier},
+    )
@@ -1,10 +1,8 @@
 import json
 import logging
-from typing import Any, Callable, Dict, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
 from urllib.parse import urlencode
 
-import tappayment as TapPay
-
 import graphene
 from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ValidationError
@@ -37,7 +35,11 @@ from ...gateway import payment_refund_or_void
 from ...interface import GatewayConfig, GatewayResponse
 from ...utils import create_payment_information, create_transaction
 
-from .utils import FAILED_STATUSES, call_api_clinet
+from .status import publish_payment_status
+from .utils import FAILED_STATUSES, cache_tap_status, call_api_clinet
+
+if TYPE_CHECKING:
+    import tappayment as TapPay
 
 logger = logging.getLogger(__name__)
 
@@ -143,7 +145,24 @@ def handle_additional_actions(
     except PaymentError as e:
         return HttpResponseBadRequest(str(e))
 
-    handle_api_response(payment, result)
+    cache_tap_status(authorize_id, result)
+    order = handle_api_response(payment, result)
+    publish_payment_status(
+        payment_id,
+        checkout_pk,
+        {
+            "status": result.get("status"),
+            "is_success": result.get("status") not in FAILED_STATUSES,
+            "order": {
+                "id": graphene.Node.to_global_id("Order", order.pk),
+                # Saleor 2.x resolves the order number from the primary key
+                "number": str(order.pk),
+                "token": str(order.token),
+            }
+            if order
+            else None,
+        },
+    )
 
     redirect_url = prepare_redirect_url(payment_id, checkout_pk, result, return_url)
     return redirect(redirect_url)
@@ -163,7 +182,7 @@ def prepare_api_request_data(tap_id: str):
 
 
 def prepare_redirect_url(
-    payment_id: str, checkout_pk: str, api_response: TapPay.Client, return_url: str
+    payment_id: str, checkout_pk: str, api_response: "TapPay.Client", return_url: str
 ):
     checkout_id = graphene.Node.to_global_id(
         "Checkout", checkout_pk  # type: ignore
@@ -183,7 +202,7 @@ def prepare_redirect_url(
 
 
 def handle_api_response(
-    payment: Payment, response: TapPay.Client,
+    payment: Payment, response: "TapPay.Client",
 ):
     checkout = get_checkout(payment)
     payment_data = create_payment_information(
@@ -222,4 +241,6 @@ def handle_api_response(
     )
 
     if is_success and not action_required:
-        create_order(payment, checkout)
+        return create_order(payment, checkout)
+    return None
+